@@ -1,29 +1,62 @@
 from flask import Flask, request, jsonify
-import whisper
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+import ctranslate2
+import numpy as np
 import os
-from werkzeug.utils import secure_filename
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from enum import Enum
 from google import genai
+from google.genai import _transformers as genai_transformers
 from dotenv import load_dotenv
 from docx import Document
-import json
+import orjson
 from datetime import datetime
 from docx.shared import Pt, Inches
 from docx.oxml.ns import qn
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 import base64
 import io
+import threading
+import secrets
 
 # --- Configuración inicial ---
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
+gemini_client = genai.Client(api_key=API_KEY)
 
 app = Flask(__name__)
-model_whisper = whisper.load_model("base")
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+def cargar_modelo_whisper():
+    """Carga Whisper en GPU (FP16) si hay CUDA disponible, si no en CPU (INT8)"""
+    device_env = os.getenv("WHISPER_DEVICE")
+    device = device_env or ("cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu")
+    compute_type = os.getenv("WHISPER_COMPUTE_TYPE") or ("float16" if device == "cuda" else "int8")
+    cpu_threads = int(os.getenv("WHISPER_CPU_THREADS", os.cpu_count() or 0))
+    try:
+        modelo = WhisperModel("base", device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+        if device == "cuda":
+            # cuDNN/cuBLAS ausentes o incompatibles fallan en la primera pasada del encoder,
+            # no al construir el modelo: se transcribe un segundo de silencio para detectarlo
+            segments, _ = modelo.transcribe(np.zeros(16000, dtype=np.float32), language="es")
+            list(segments)
+    except Exception as e:
+        # Solo se cae a CPU si el dispositivo se eligió automáticamente
+        if device == "cpu" or device_env:
+            raise
+        print(f"⚠️ No se pudo usar Whisper en {device} ({e}), usando CPU")
+        device, compute_type = "cpu", "int8"
+        modelo = WhisperModel("base", device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    print(f"✅ Whisper cargado en {device} ({compute_type})")
+    return modelo
+
+model_whisper = cargar_modelo_whisper()
+# Agrupa los fragmentos de voz del audio en lotes para el encoder
+pipeline_whisper = BatchedInferencePipeline(model=model_whisper)
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "16"))
+# Un solo modelo compartido entre hilos: la transcripción se serializa,
+# pero las llamadas a Gemini de otras peticiones siguen en paralelo
+whisper_lock = threading.Lock()
 
 # --- Esquemas Pydantic ---
 class TipoInforme(str, Enum):
@@ -52,7 +85,7 @@ class Neurologico(BaseModel):
 class Evolucion(BaseModel):
     estado_general: str = Field(..., description="Resumen del estado general del paciente")
     EFG: str = Field(..., description="Exploración física general")
-    EFR: Optional[str] = Field("", description="Exploración física regional (opcional)")
+    EFR: Optional[str] = Field(default="", description="Exploración física regional (opcional)")
     cuello: str
     torax_anterior: str
     torax_posterior: str
@@ -89,30 +122,64 @@ class InformeGeriatrico(BaseModel):
     RD: str = Field(..., description="Resultados de rayos X o diagnóstico por imágenes")
     descripcion_paciente: str = Field(..., description="Descripción clínica del paciente usando sexo, edad y días de internación")
 
-def traducir_dia(dia_en):
-    """Traduce nombres de días del inglés al español"""
-    dias = {
-        "Monday": "Lunes", "Tuesday": "Martes", "Wednesday": "Miércoles",
-        "Thursday": "Jueves", "Friday": "Viernes", "Saturday": "Sábado", "Sunday": "Domingo"
-    }
-    return dias.get(dia_en, dia_en)
-
-def agregar_texto_negrita(paragraph, texto, fuente=10):
-    """Agrega texto en negrita a un párrafo"""
-    run = paragraph.add_run(texto)
-    run.bold = True
-    run.font.name = "Arial"
-    run.font.size = Pt(fuente)
-
-def agregar_texto(paragraph, texto, fuente=10):
-    """Agrega texto normal a un párrafo"""
-    run = paragraph.add_run(texto)
-    run.font.name = "Arial"
-    run.font.size = Pt(fuente)
-
-def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
-    """Genera un documento Word desde datos JSON estructurados"""
+# Schema convertido una sola vez al importar con la misma transformación que aplica el SDK
+# a response_schema=InformeGeriatrico, así el payload enviado a Gemini no cambia
+INFORME_SCHEMA = genai_transformers.t_schema(gemini_client._api_client, InformeGeriatrico)
+
+# Plantilla del prompt para Gemini; solo se sustituyen el tipo de informe y la transcripción
+PROMPT_TEMPLATE = """
+Quiero que estructures este texto clínico en formato JSON. El tipo de informe es "{tipo}".
+
+Usa la siguiente lógica:
+- Extrae los datos del paciente y colócalos en el campo "paciente".
+- Organiza signos vitales en el campo "signos_vitales".
+- Coloca los diagnósticos como una lista en "diagnosticos".
+- Llena "evolucion", "ingresos", "egresos" y "ordenes_medicas" según el contenido médico.
+- Usa el formato de fecha ISO 8601 para el campo "fecha_hora".
+- No inventes información: si algún campo no está presente, devuélvelo vacío (ej: "" o 0).
+- A partir del sexo, edad y día de internación del paciente, construye un campo llamado "descripcion_paciente" con esta estructura:
+  "Paciente de sexo {{sexo}} de {{edad}} años de edad en su {{dia_internacion}} día de internación con los diagnósticos de:"
+
+Texto del informe:
+\"\"\"{texto}\"\"\"
+
+Genera una salida JSON estructurada según el esquema del tipo de informe.
+"""
+
+# Días de la semana en español, indexados por datetime.weekday()
+DIAS_ES = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+# Tamaños de fuente usados en el documento, construidos una sola vez
+TAMANOS_PT = {8: Pt(8), 9: Pt(9), 10: Pt(10)}
+
+def agregar_texto(add_run, texto, fuente=10, negrita=False):
+    """Agrega texto (normal o en negrita) mediante el add_run del párrafo"""
+    font = add_run(texto).font
+    font.size = TAMANOS_PT.get(fuente) or Pt(fuente)
+    if negrita:
+        font.bold = True
+
+# Anchos de columna en twips (1 pulgada = 1440 twips), calculados una sola vez
+ANCHOS_PACIENTE = tuple(str(round(ancho / 635)) for ancho in
+                        (Inches(1.5), Inches(1.5), Inches(1.8), Inches(1.24), Inches(1.24)))
+ANCHOS_PRINCIPAL = tuple(str(round(ancho / 635)) for ancho in
+                         (Inches(1.8),    # FECHA Y HORA
+                          Inches(3.8),    # NOTAS DE EVOLUCIÓN
+                          Inches(1.68)))  # ÓRDENES MÉDICAS
+
+def fijar_anchos_columnas(tabla, anchos_twips):
+    """Escribe los anchos directamente en los <w:gridCol> del <w:tblGrid> de la tabla"""
+    for grid_col, ancho in zip(tabla._tbl.tblGrid.gridCol_lst, anchos_twips):
+        grid_col.set(qn('w:w'), ancho)
+
+def construir_plantilla_docx() -> bytes:
+    """Construye el esqueleto del informe (estilos, márgenes, tablas y encabezados) sin datos"""
     doc = Document()
+
+    # Fuente por defecto para todo el documento
+    estilo = doc.styles['Normal']
+    estilo.font.name = "Arial"
+    estilo.font.size = TAMANOS_PT[10]
     
     # Configurar márgenes de 1cm
     sections = doc.sections
@@ -131,32 +198,17 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     
     # Configurar anchos proporcionales para la tabla de paciente
     table.autofit = False
-    ancho_total_paciente = Inches(7.28)  # Ancho disponible con márgenes de 1cm
-    anchos_paciente = [Inches(1.5), Inches(1.5), Inches(1.8), Inches(1.24), Inches(1.24)]
-    
-    for i, ancho in enumerate(anchos_paciente):
-        table.columns[i].width = ancho
+    fijar_anchos_columnas(table, ANCHOS_PACIENTE)
     
     hdr_cells = table.rows[0].cells
     for i, titulo in enumerate(encabezado_paciente):
         p = hdr_cells[i].paragraphs[0]
         p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        agregar_texto_negrita(p, titulo, 9)
+        agregar_texto(p.add_run, titulo, 9, negrita=True)
 
-    paciente = data.get('paciente', {})
-    row_cells = table.add_row().cells
-    datos_paciente = [
-        paciente.get('apellido_paterno', ''),
-        paciente.get('apellido_materno', ''),
-        paciente.get('nombres', ''),
-        str(paciente.get('n_historia', '')),
-        str(paciente.get('n_cama', ''))
-    ]
-    
-    for i, dato in enumerate(datos_paciente):
-        p = row_cells[i].paragraphs[0]
-        p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        agregar_texto(p, dato, 9)
+    # Fila vacía para los datos del paciente
+    for cell in table.add_row().cells:
+        cell.paragraphs[0].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
 
     doc.add_paragraph()  # espacio
 
@@ -168,19 +220,43 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     tabla.autofit = False
 
     # Ajustar anchos para que no se pasen de los bordes
-    ancho_total = Inches(7.28)  # Ancho disponible con márgenes de 1cm
-    tabla.columns[0].width = Inches(1.8)   # FECHA Y HORA
-    tabla.columns[1].width = Inches(3.8)   # NOTAS DE EVOLUCIÓN
-    tabla.columns[2].width = Inches(1.68)  # ÓRDENES MÉDICAS
+    fijar_anchos_columnas(tabla, ANCHOS_PRINCIPAL)
 
     encabezados = ["FECHA Y HORA", "NOTAS DE EVOLUCIÓN", "ÓRDENES MÉDICAS"]
     for i, texto in enumerate(encabezados):
         p = tabla.rows[0].cells[i].paragraphs[0]
         p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        agregar_texto_negrita(p, texto, 9)
+        agregar_texto(p.add_run, texto, 9, negrita=True)
 
-    # Agregar fila de contenido
-    fila_contenido = tabla.add_row()
+    # Fila vacía para el contenido
+    tabla.add_row()
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+# Esqueleto construido una sola vez al importar; cada informe parte de una copia
+PLANTILLA_DOCX = construir_plantilla_docx()
+
+def generar_docx_desde_json(data: dict) -> bytes:
+    """Genera un documento Word desde datos JSON estructurados y devuelve sus bytes"""
+    doc = Document(io.BytesIO(PLANTILLA_DOCX))
+    tabla_paciente, tabla = doc.tables
+
+    paciente = data.get('paciente', {})
+    row_cells = tabla_paciente.rows[1].cells
+    datos_paciente = [
+        paciente.get('apellido_paterno', ''),
+        paciente.get('apellido_materno', ''),
+        paciente.get('nombres', ''),
+        str(paciente.get('n_historia', '')),
+        str(paciente.get('n_cama', ''))
+    ]
+    
+    for i, dato in enumerate(datos_paciente):
+        agregar_texto(row_cells[i].paragraphs[0].add_run, dato, 9)
+
+    fila_contenido = tabla.rows[1]
 
     # -------------------------
     # Columna 1: Fecha y Signos
@@ -188,9 +264,9 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     fecha_iso = data.get('fecha_hora', '')
     try:
         dt = datetime.fromisoformat(fecha_iso)
-        dia_semana = traducir_dia(dt.strftime("%A"))
-        fecha_formateada = dt.strftime("%d/%m/%y")
-        hora = dt.strftime("%H:%M")
+        dia_semana = DIAS_ES[dt.weekday()]
+        fecha_formateada = f"{dt.day:02d}/{dt.month:02d}/{dt.year % 100:02d}"
+        hora = f"{dt.hour:02d}:{dt.minute:02d}"
     except Exception:
         dia_semana = ""
         fecha_formateada = ""
@@ -199,19 +275,20 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     signos_vitales = data.get('signos_vitales', {})
     cell_fecha = fila_contenido.cells[0]
     p = cell_fecha.paragraphs[0]
+    add_fecha = p.add_run
 
     if dia_semana:
-        agregar_texto_negrita(p, f"{dia_semana}\n", 8)
+        agregar_texto(add_fecha, f"{dia_semana}\n", 8, negrita=True)
     if fecha_formateada:
-        agregar_texto(p, f"{fecha_formateada}\n", 8)
+        agregar_texto(add_fecha, f"{fecha_formateada}\n", 8)
     if hora:
-        agregar_texto(p, f"{hora}\n\n", 8)
+        agregar_texto(add_fecha, f"{hora}\n\n", 8)
     
     for key in ['PA', 'FC', 'FR', 'O2']:
         valor = signos_vitales.get(key)
         if valor:
-            agregar_texto_negrita(p, f"{key}: ", 8)
-            agregar_texto(p, f"{valor}\n", 8)
+            agregar_texto(add_fecha, f"{key}: ", 8, negrita=True)
+            agregar_texto(add_fecha, f"{valor}\n", 8)
 
     # -------------------------
     # Columna 2: Notas de Evolución
@@ -221,19 +298,20 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     evolucion = data.get('evolucion', {})
     cell_notas = fila_contenido.cells[1]
     p_notas = cell_notas.paragraphs[0]
+    add_notas = p_notas.add_run
 
     if descripcion:
-        agregar_texto(p_notas, descripcion + "\n\n", 8)
+        agregar_texto(add_notas, descripcion + "\n\n", 8)
 
     if diagnosticos:
-        agregar_texto_negrita(p_notas, "DIAGNÓSTICOS:\n", 8)
+        agregar_texto(add_notas, "DIAGNÓSTICOS:\n", 8, negrita=True)
         for diag in diagnosticos:
-            agregar_texto(p_notas, f"• {diag.upper()}\n", 8)
-        agregar_texto(p_notas, "\n", 8)
+            agregar_texto(add_notas, f"• {diag.upper()}\n", 8)
+        agregar_texto(add_notas, "\n", 8)
 
     if evolucion.get("estado_general"):
-        agregar_texto_negrita(p_notas, "S: ", 8)
-        agregar_texto(p_notas, f"{evolucion['estado_general']}\n\n", 8)
+        agregar_texto(add_notas, "S: ", 8, negrita=True)
+        agregar_texto(add_notas, f"{evolucion['estado_general']}\n\n", 8)
 
     # Campos de evolución física
     campos_fisicos = {
@@ -248,12 +326,12 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     for key, label in campos_fisicos.items():
         valor = evolucion.get(key)
         if valor:
-            agregar_texto_negrita(p_notas, f"{label}: ", 8)
-            agregar_texto(p_notas, f"{valor}\n", 8)
+            agregar_texto(add_notas, f"{label}: ", 8, negrita=True)
+            agregar_texto(add_notas, f"{valor}\n", 8)
 
     if evolucion.get("EFG"):
-        agregar_texto_negrita(p_notas, "\nEFG: ", 8)
-        agregar_texto(p_notas, f"{evolucion['EFG']}\n", 8)
+        agregar_texto(add_notas, "\nEFG: ", 8, negrita=True)
+        agregar_texto(add_notas, f"{evolucion['EFG']}\n", 8)
 
     # Examen neurológico
     neurologico = evolucion.get("neurologico", {})
@@ -268,18 +346,18 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
             enb_texto.append(f"Glasgow {neurologico['glasgow']}")
 
         if enb_texto:
-            agregar_texto_negrita(p_notas, "\nENB: ", 8)
-            agregar_texto(p_notas, ", ".join(enb_texto) + "\n", 8)
+            agregar_texto(add_notas, "\nENB: ", 8, negrita=True)
+            agregar_texto(add_notas, ", ".join(enb_texto) + "\n", 8)
 
     # Resultados de laboratorio e imágenes
     bh = data.get("BH", "")
     rd = data.get("RD", "")
     if bh:
-        agregar_texto_negrita(p_notas, "\nBH: ", 8)
-        agregar_texto(p_notas, f"{bh}\n", 8)
+        agregar_texto(add_notas, "\nBH: ", 8, negrita=True)
+        agregar_texto(add_notas, f"{bh}\n", 8)
     if rd:
-        agregar_texto_negrita(p_notas, "\nRD: ", 8)
-        agregar_texto(p_notas, f"{rd}\n", 8)
+        agregar_texto(add_notas, "\nRD: ", 8, negrita=True)
+        agregar_texto(add_notas, f"{rd}\n", 8)
 
     # -------------------------
     # Columna 3: Órdenes Médicas
@@ -287,36 +365,57 @@ def generar_docx_desde_json(data: dict, nombre_archivo: str = "informe.docx"):
     ordenes = data.get("ordenes_medicas", [])
     cell_ordenes = fila_contenido.cells[2]
     p_ordenes = cell_ordenes.paragraphs[0]
+    add_ordenes = p_ordenes.add_run
     
     for i, orden in enumerate(ordenes):
         # Dividir órdenes largas en múltiples líneas si es necesario
         orden_text = f"{i + 1}. {orden}"
-        agregar_texto(p_ordenes, orden_text + "\n", 8)
+        agregar_texto(add_ordenes, orden_text + "\n", 8)
 
     # Ingresos y Egresos
     ingresos = data.get("ingresos", {})
     egresos = data.get("egresos", {})
     
     if any(ingresos.values()) or any(egresos.values()):
-        agregar_texto(p_ordenes, "\n", 8)
+        agregar_texto(add_ordenes, "\n", 8)
         
         if any(ingresos.values()):
-            agregar_texto_negrita(p_ordenes, "INGRESOS:\n", 8)
+            agregar_texto(add_ordenes, "INGRESOS:\n", 8, negrita=True)
             for key, val in ingresos.items():
                 if val:
-                    agregar_texto(p_ordenes, f"{key}: {val}\n", 8)
+                    agregar_texto(add_ordenes, f"{key}: {val}\n", 8)
         
         if any(egresos.values()):
-            agregar_texto_negrita(p_ordenes, "\nEGRESOS:\n", 8)
+            agregar_texto(add_ordenes, "\nEGRESOS:\n", 8, negrita=True)
             for key, val in egresos.items():
                 if val:
-                    agregar_texto(p_ordenes, f"{key}: {val}\n", 8)
+                    agregar_texto(add_ordenes, f"{key}: {val}\n", 8)
 
     # -------------------------
-    # Guardar documento
+    # Guardar documento en memoria
     # -------------------------
-    doc.save(nombre_archivo)
-    print(f"✅ Documento guardado como: {nombre_archivo}")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+def respuesta_multipart(data_json: dict, doc_bytes: bytes):
+    """Devuelve un multipart/mixed con una parte JSON y el .docx como adjunto, sin base64"""
+    boundary = secrets.token_hex(16)
+    separador = f"--{boundary}\r\n".encode("ascii")
+    cuerpo = b"".join([
+        separador,
+        b"Content-Type: application/json\r\n\r\n",
+        orjson.dumps(data_json),
+        b"\r\n",
+        separador,
+        f"Content-Type: {DOCX_MIMETYPE}\r\n".encode("ascii"),
+        b'Content-Disposition: attachment; filename="informe.docx"\r\n\r\n',
+        doc_bytes,
+        f"\r\n--{boundary}--\r\n".encode("ascii"),
+    ])
+    return app.response_class(cuerpo, mimetype=f'multipart/mixed; boundary="{boundary}"')
 
 # --- Endpoint principal ---
 @app.route("/procesar_informe", methods=["POST"])
@@ -332,64 +431,52 @@ def procesar_informe():
         return jsonify({"error": f"Tipo de informe inválido: {tipo_informe}"}), 400
 
     audio = request.files['audio']
-    filename = secure_filename(audio.filename)
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    audio.save(filepath)
 
     try:
-        result = model_whisper.transcribe(filepath)
-        texto_crudo = result["text"]
-        os.remove(filepath)
+        # Decodifica el audio en memoria a float32 mono 16 kHz, sin pasar por disco
+        audio_array = decode_audio(io.BytesIO(audio.read()), sampling_rate=16000)
+        with whisper_lock:
+            # segments es un generador: la transcripción ocurre al iterarlo
+            segments, _ = pipeline_whisper.transcribe(audio_array, batch_size=WHISPER_BATCH_SIZE, vad_filter=True)
+            texto_crudo = "".join(s.text for s in segments)
     except Exception as e:
         return jsonify({"error": f"Error al transcribir audio: {str(e)}"}), 500
 
-    prompt = f"""
-Quiero que estructures este texto clínico en formato JSON. El tipo de informe es "{tipo_enum.value}".
-
-Usa la siguiente lógica:
-- Extrae los datos del paciente y colócalos en el campo "paciente".
-- Organiza signos vitales en el campo "signos_vitales".
-- Coloca los diagnósticos como una lista en "diagnosticos".
-- Llena "evolucion", "ingresos", "egresos" y "ordenes_medicas" según el contenido médico.
-- Usa el formato de fecha ISO 8601 para el campo "fecha_hora".
-- No inventes información: si algún campo no está presente, devuélvelo vacío (ej: "" o 0).
-- A partir del sexo, edad y día de internación del paciente, construye un campo llamado "descripcion_paciente" con esta estructura:
-  "Paciente de sexo {{sexo}} de {{edad}} años de edad en su {{dia_internacion}} día de internación con los diagnósticos de:"
-
-Texto del informe:
-\"\"\"{texto_crudo}\"\"\"
-
-Genera una salida JSON estructurada según el esquema del tipo de informe.
-"""
+    prompt = PROMPT_TEMPLATE.format(tipo=tipo_enum.value, texto=texto_crudo)
 
     try:
-        client = genai.Client(api_key=API_KEY)
-        response = client.models.generate_content(
+        response = gemini_client.models.generate_content(
             model="gemini-2.5-pro",
             contents=prompt,
             config={
                 "response_mime_type": "application/json",
-                "response_schema": InformeGeriatrico
+                "response_schema": INFORME_SCHEMA
             }
         )
-        data_json = json.loads(response.text)
-        file_path = "informe.docx"
-        generar_docx_desde_json(data_json, nombre_archivo=file_path)
-
-        with open(file_path, "rb") as f:
-            doc_bytes = f.read()
-            doc_base64 = base64.b64encode(doc_bytes).decode("utf-8")
-
-        return jsonify({
-            "json_generado": data_json,
-            "documento_base64": doc_base64
-        })
-
-
-        return response.text
+        data_json = orjson.loads(response.text)
+        doc_bytes = generar_docx_desde_json(data_json)
+
+        # Con "Accept: multipart/mixed" el JSON y el documento van en partes separadas, sin base64
+        if request.accept_mimetypes.best_match(["application/json", "multipart/mixed"]) == "multipart/mixed":
+            respuesta = respuesta_multipart(data_json, doc_bytes)
+        else:
+            doc_base64 = base64.b64encode(doc_bytes).decode("ascii")
+            respuesta = app.response_class(
+                orjson.dumps({
+                    "json_generado": data_json,
+                    "documento_base64": doc_base64
+                }),
+                mimetype="application/json"
+            )
+        respuesta.vary.add("Accept")
+        return respuesta
     except Exception as e:
         return jsonify({"error": f"Error al generar respuesta con Gemini: {str(e)}"}), 500
 
 # --- Iniciar servidor ---
+# En producción usar un servidor WSGI con un solo worker e hilos, por ejemplo:
+#   gunicorn -w 1 --threads 8 -b 0.0.0.0:5000 app:app
+# Sin --preload: el modelo de CTranslate2 (y su contexto CUDA) debe crearse en el worker, no antes del fork
+# El servidor de desarrollo solo activa el modo debug (y su recargador) con FLASK_DEBUG=1
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1")
\ No newline at end of file